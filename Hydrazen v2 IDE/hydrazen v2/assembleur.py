@@ -0,0 +1,135 @@
+import re
+
+OPCODES = {
+    'NOP': 0x0,
+    'HLT': 0x1,
+    'ADD': 0x2,
+    'SUB': 0x3,
+    'AND': 0x4,
+    'OR':  0x5,
+    'XOR': 0x6,
+    'NOR': 0x7,
+    'JMP': 0x8,
+    'RSH': 0x9,
+    'LSH': 0xA,
+    'LDI': 0xB,
+    'ADI': 0xC,
+    'BRZ': 0xD,
+    'PLT': 0xE,
+    'SEG': 0xF
+}
+
+def reg_num_token(tok):
+    return int(tok.strip().upper().replace("R", ""))
+
+def assemble(asm, debug_info=None):
+    lines = []
+    for raw_line in asm.splitlines():
+        line = raw_line.split(";", 1)[0].strip()
+        lines.append(line.upper())
+
+    labels = {}
+    pc = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if ":" in line:
+            label, rest = line.split(":", 1)
+            labels[label.strip()] = pc
+            line = rest.strip()
+            if not line:
+                continue
+        pc += 2
+
+    rom = []
+    pc_lines = {}
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if ":" in line:
+            _, line = line.split(":", 1)
+            line = line.strip()
+            if not line:
+                continue
+
+        parts = line.split()
+        if not parts:
+            continue
+
+        instr = parts[0]
+        opcode = OPCODES.get(instr)
+        if opcode is None:
+            raise ValueError(f"Line {lineno}: Unknown instruction: {instr}")
+
+        try:
+            operands_str = line[len(instr):].strip()
+            operands = [op.strip() for op in operands_str.split(",") if op.strip()]
+
+            if instr in ('ADD', 'SUB', 'AND', 'OR', 'XOR', 'NOR'):
+                if len(operands) != 3:
+                    raise ValueError(f"Line {lineno}: Expected 3 operands")
+                a, b, c = map(reg_num_token, operands)
+                opval = (a << 8) | (b << 4) | c
+
+            elif instr in ('RSH', 'LSH'):
+                if len(operands) != 3:
+                    raise ValueError(f"Line {lineno}: Expected 3 operands")
+                a = reg_num_token(operands[0])
+                c = reg_num_token(operands[2])
+                opval = (a << 8) | c
+
+            elif instr in ('LDI', 'ADI'):
+                if len(operands) != 2:
+                    raise ValueError(f"Line {lineno}: Expected 2 operands")
+                r = reg_num_token(operands[0])
+                val_tok = operands[1].upper()
+                if re.match(r'^[A-Z_][A-Z0-9_]*$', val_tok) and val_tok in labels:
+                    val = labels[val_tok]
+                else:
+                    val = int(val_tok, 0)
+                opval = (r << 8) | (val & 0xFF)
+
+            elif instr == 'SEG':
+                if len(operands) != 1:
+                    raise ValueError(f"Line {lineno}: Expected 1 operand")
+                r = reg_num_token(operands[0])
+                opval = (r << 8)
+
+            elif instr in ('JMP', 'BRZ'):
+                if len(operands) != 1:
+                    raise ValueError(f"Line {lineno}: Expected 1 operand")
+                arg = operands[0].upper()
+                if re.match(r'^[A-Z_][A-Z0-9_]*$', arg) and arg in labels:
+                    addr = labels[arg]
+                else:
+                    addr = int(arg, 0)
+                opval = addr & 0xFF
+
+            elif instr == 'PLT':
+                if len(operands) != 2:
+                    raise ValueError(f"Line {lineno}: Expected 2 operands")
+                x, y = map(reg_num_token, operands)
+                opval = (x << 8) | (y << 4)
+
+            elif instr in ('NOP', 'HLT'):
+                opval = 0
+
+            else:
+                raise ValueError(f"Line {lineno}: Invalid syntax")
+
+            byte1 = (opcode << 4) | ((opval >> 8) & 0xF)
+            byte2 = opval & 0xFF
+            pc_lines[len(rom)] = lineno
+            rom.append(byte1)
+            rom.append(byte2)
+
+        except Exception as e:
+            raise ValueError(f"Line {lineno}: {e}")
+
+    if debug_info is not None:
+        debug_info["labels"] = labels
+        debug_info["lines"] = pc_lines
+
+    return rom
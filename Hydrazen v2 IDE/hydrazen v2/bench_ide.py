@@ -0,0 +1,152 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = ["fibonacci.Hydra2", "compte_jusque_a_10.Hydra2", "carre.Hydra2", "randome.Hydra2",
+           "balle_controllabe.Hydra2"]
+METRICS = ["keystroke", "highlight_syntax", "update_line_numbers", "enforce_line_limit",
+           "convert_to_binary", "assemble"]
+
+def start_virtual_display():
+    # sans serveur X, on lance un Xvfb temporaire s'il est installé
+    if os.environ.get("DISPLAY") or sys.platform == "win32" or not shutil.which("Xvfb"):
+        return None
+    # Xvfb choisit un écran libre et écrit son numéro dans le tube une fois prêt à accepter les connexions
+    read_fd, write_fd = os.pipe()
+    proc = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-screen", "0", "1280x800x24"],
+                            pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        number = f.readline().strip()
+    if not number:
+        proc.wait()
+        print("Xvfb n'a pas pu démarrer")
+        return None
+    os.environ["DISPLAY"] = f":{number}"
+    return proc
+
+def percentile(values, p):
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+def timed(samples, name, fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    samples.setdefault(name, []).append((time.perf_counter() - t0) * 1000)
+    return result
+
+def keystroke(ide, samples, action):
+    t0 = time.perf_counter()
+    action()
+    ide.root.update()
+    ide.editor.event_generate("<KeyRelease>")
+    ide.root.update()
+    samples.setdefault("keystroke", []).append((time.perf_counter() - t0) * 1000)
+    timed(samples, "highlight_syntax", ide.highlight_syntax)
+    timed(samples, "update_line_numbers", ide.update_line_numbers)
+    timed(samples, "enforce_line_limit", ide.enforce_line_limit)
+
+def replay_typing(ide, samples, text):
+    ide.editor.delete("1.0", "end")
+    for ch in text:
+        keystroke(ide, samples, lambda c=ch: ide.editor.insert("end-1c", c))
+
+def replay_edit(ide, samples, text):
+    # insère puis efface une instruction au milieu d'un programme déjà chargé
+    ide.editor.delete("1.0", "end")
+    ide.editor.insert("1.0", text)
+    ide.root.update()
+    middle = max(1, text.count("\n") // 2)
+    ide.editor.mark_set("insert", f"{middle}.0")
+    line = "ADD R1, R2, R3 ; test\n"
+    for ch in line:
+        keystroke(ide, samples, lambda c=ch: ide.editor.insert("insert", c))
+    for _ in line:
+        keystroke(ide, samples, lambda: ide.editor.delete("insert-1c"))
+
+def run_benchmark(rounds):
+    sys.path.insert(0, base_dir)
+    import ide
+    ide.root.withdraw()
+    ide.speculate_var.set(False)
+    ide.speculator.cancel()
+    samples = {}
+    for _ in range(rounds):
+        for name in SAMPLES:
+            with open(os.path.join(base_dir, name), "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+            replay_typing(ide, samples, text)
+            replay_edit(ide, samples, text)
+            timed(samples, "assemble", ide.assemble, text)
+            ide.editor.delete("1.0", "end")
+            ide.editor.insert("1.0", text)
+            ide.root.update()
+            timed(samples, "convert_to_binary", ide.convert_to_binary)
+            ide.root.update()
+    ide.root.destroy()
+    return {name: {"p50": round(percentile(values, 50), 4), "p99": round(percentile(values, 99), 4),
+                   "n": len(values)} for name, values in samples.items()}
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"{'mesure':<22}{'p50 ms':>10}{'p99 ms':>10}{'p50 réf':>10}{'p99 réf':>10}")
+    for name in METRICS:
+        if name not in results:
+            continue
+        r = results[name]
+        b = baseline.get(name) if baseline else None
+        ref = f"{b['p50']:>10.3f}{b['p99']:>10.3f}" if b else ""
+        print(f"{name:<22}{r['p50']:>10.3f}{r['p99']:>10.3f}{ref}")
+        if b:
+            for key in ("p50", "p99"):
+                if r[key] > b[key] * (1 + tolerance):
+                    regressions.append(f"{name} {key} : {r[key]:.3f} ms contre {b[key]:.3f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure la latence par frappe de l'éditeur Hydra2")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--baseline", default=os.path.join(base_dir, "bench_baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="marge acceptée avant de signaler une régression")
+    parser.add_argument("--json", help="écrit aussi les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    xvfb = start_virtual_display()
+    try:
+        results = run_benchmark(args.rounds)
+    finally:
+        if xvfb:
+            xvfb.terminate()
+
+    baseline = None
+    if not args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        else:
+            print(f"aucune référence dans {args.baseline} : rien à comparer, relancez avec --save-baseline")
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print("référence enregistrée :", args.baseline)
+    if regressions:
+        print("régressions :")
+        for r in regressions:
+            print("   ", r)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import os
+import struct
+import zlib
+import headless
+
+SCALE = 10
+SEGMENT_HEIGHT = 100
+LAMP_BROWN = (0, 0, 0)
+LAMP_YELLOW = (255, 235, 103)
+PALETTE = [LAMP_BROWN, LAMP_YELLOW]
+
+#  aaa
+# f   b
+#  ggg
+# e   c
+#  ddd
+DIGIT_SEGMENTS = ["abcdef", "bc", "abdeg", "abcdg", "bcfg", "acdfg", "acdefg", "abc", "abcdefg", "abcdfg"]
+
+class FrameRecorder:
+    def __init__(self, emulator):
+        self.emulator = emulator
+        self.frames = []
+        self.snapshot(0)
+
+    def pack_screen(self):
+        packed = bytearray()
+        bits = 0
+        count = 0
+        for row in self.emulator.screen_buf:
+            for px in row:
+                bits = (bits << 1) | px
+                count += 1
+                if count == 8:
+                    packed.append(bits)
+                    bits = 0
+                    count = 0
+        return bytes(packed)
+
+    def snapshot(self, cycle):
+        screen = self.pack_screen()
+        segment = self.emulator.segment_value
+        if self.frames and self.frames[-1][1] == screen and self.frames[-1][2] == segment:
+            return
+        self.frames.append((cycle, screen, segment))
+
+def unpack_screen(screen, width, height):
+    return [[(screen[(y * width + x) // 8] >> (7 - (y * width + x) % 8)) & 1 for x in range(width)]
+            for y in range(height)]
+
+def draw_digit(rows, x0, y0, digit, scale):
+    w = 4 * scale
+    h = 7 * scale
+    t = max(1, scale - 2)
+    half = h // 2
+    boxes = {
+        "a": (x0, y0, w, t),
+        "b": (x0 + w - t, y0, t, half),
+        "c": (x0 + w - t, y0 + half, t, h - half),
+        "d": (x0, y0 + h - t, w, t),
+        "e": (x0, y0 + half, t, h - half),
+        "f": (x0, y0, t, half),
+        "g": (x0, y0 + half - t // 2, w, t),
+    }
+    for seg in DIGIT_SEGMENTS[digit]:
+        bx, by, bw, bh = boxes[seg]
+        for y in range(by, by + bh):
+            row = rows[y]
+            for x in range(bx, bx + bw):
+                row[x] = 1
+
+def render(frame, width, height, scale=SCALE):
+    _, screen, segment = frame
+    pixels = unpack_screen(screen, width, height)
+    rows = []
+    for line in pixels:
+        scaled = bytearray()
+        for px in line:
+            scaled += bytes([px]) * scale
+        rows.extend(bytearray(scaled) for _ in range(scale))
+    strip_height = SEGMENT_HEIGHT * scale // 10
+    rows.extend(bytearray(width * scale) for _ in range(strip_height))
+    for i, ch in enumerate(f"{segment:03}"):
+        draw_digit(rows, scale + i * 6 * scale, height * scale + (strip_height - 7 * scale) // 2, int(ch), scale)
+    return rows
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+def png_header(w, h):
+    palette = b"".join(bytes(c) for c in PALETTE)
+    return (b"\x89PNG\r\n\x1a\n"
+            + png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 3, 0, 0, 0))
+            + png_chunk(b"PLTE", palette))
+
+def png_data(rows):
+    return zlib.compress(b"".join(b"\x00" + bytes(r) for r in rows), 9)
+
+def write_png(path, rows):
+    with open(path, "wb") as f:
+        f.write(png_header(len(rows[0]), len(rows)))
+        f.write(png_chunk(b"IDAT", png_data(rows)))
+        f.write(png_chunk(b"IEND", b""))
+
+def write_apng(path, images, delays_ms):
+    w, h = len(images[0][0]), len(images[0])
+    seq = 0
+    with open(path, "wb") as f:
+        f.write(png_header(w, h))
+        f.write(png_chunk(b"acTL", struct.pack(">II", len(images), 0)))
+        for i, (rows, delay) in enumerate(zip(images, delays_ms)):
+            f.write(png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", seq, w, h, 0, 0, min(65535, round(delay)), 1000, 0, 0)))
+            seq += 1
+            data = png_data(rows)
+            if i == 0:
+                f.write(png_chunk(b"IDAT", data))
+            else:
+                f.write(png_chunk(b"fdAT", struct.pack(">I", seq) + data))
+                seq += 1
+        f.write(png_chunk(b"IEND", b""))
+
+def lzw_encode(pixels, min_code_size=2):
+    clear = 1 << min_code_size
+    eoi = clear + 1
+    out = bytearray()
+    acc = 0
+    nbits = 0
+
+    def emit(code, size):
+        nonlocal acc, nbits
+        acc |= code << nbits
+        nbits += size
+        while nbits >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            nbits -= 8
+
+    codes = {}
+    next_code = eoi + 1
+    code_size = min_code_size + 1
+    emit(clear, code_size)
+    prefix = pixels[0]
+    for k in pixels[1:]:
+        key = (prefix, k)
+        if key in codes:
+            prefix = codes[key]
+            continue
+        emit(prefix, code_size)
+        if next_code < 4096:
+            codes[key] = next_code
+            next_code += 1
+            if next_code > (1 << code_size) and code_size < 12:
+                code_size += 1
+        else:
+            emit(clear, code_size)
+            codes = {}
+            next_code = eoi + 1
+            code_size = min_code_size + 1
+        prefix = k
+    emit(prefix, code_size)
+    emit(eoi, code_size)
+    if nbits:
+        out.append(acc & 0xFF)
+    return bytes(out)
+
+def write_gif(path, images, delays_ms):
+    w, h = len(images[0][0]), len(images[0])
+    palette = b"".join(bytes(c) for c in PALETTE + [(0, 0, 0)] * 2)
+    with open(path, "wb") as f:
+        f.write(b"GIF89a" + struct.pack("<HHBBB", w, h, 0xF1, 0, 0) + palette)
+        f.write(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00")
+        for rows, delay in zip(images, delays_ms):
+            f.write(b"\x21\xF9\x04\x00" + struct.pack("<H", min(65535, max(2, round(delay / 10)))) + b"\x00\x00")
+            f.write(b"\x2C" + struct.pack("<HHHHB", 0, 0, w, h, 0) + b"\x02")
+            data = lzw_encode(b"".join(bytes(r) for r in rows))
+            for i in range(0, len(data), 255):
+                block = data[i:i + 255]
+                f.write(bytes([len(block)]) + block)
+            f.write(b"\x00")
+        f.write(b"\x3B")
+
+def write_raw(path, frames, width, height, hz):
+    # en-tête "HYD2", largeur, hauteur, fréquence ; puis par image : cycle, segment, écran (1 bit par pixel)
+    with open(path, "wb") as f:
+        f.write(b"HYD2" + struct.pack("<BBd", width, height, hz))
+        for cycle, screen, segment in frames:
+            f.write(struct.pack("<IB", cycle, segment) + screen)
+
+def frame_delays(frames, end_cycle, hz):
+    cycles = [c for c, _, _ in frames] + [end_cycle]
+    return [max(1000.0 / hz, (cycles[i + 1] - cycles[i]) * 1000.0 / hz) for i in range(len(frames))]
+
+def capture(rom, max_cycles, inputs=()):
+    emulator = headless.load_emulator(rom)
+    recorder = FrameRecorder(emulator)
+    end_cycle = headless.run(emulator, max_cycles, inputs, on_output=recorder.snapshot)
+    return emulator, recorder.frames, end_cycle
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture headless de l'écran et du segment d'un programme Hydra2")
+    parser.add_argument("program")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("-f", "--format", choices=("png", "apng", "gif", "raw"), default="png")
+    parser.add_argument("--cycles", type=int, default=100000)
+    parser.add_argument("--hz", type=float, default=60.0)
+    parser.add_argument("--scale", type=int, default=SCALE)
+    parser.add_argument("--input", default="", help="valeurs de R15 au format cycle:valeur,cycle:valeur")
+    args = parser.parse_args()
+
+    rom = headless.load_program(args.program)
+    emulator, frames, end_cycle = capture(rom, args.cycles, headless.parse_inputs(args.input))
+    width, height = emulator.SCREEN_WIDTH, emulator.SCREEN_HEIGHT
+    delays = frame_delays(frames, end_cycle, args.hz)
+
+    if args.format == "raw":
+        write_raw(args.output, frames, width, height, args.hz)
+    elif args.format == "png":
+        os.makedirs(args.output, exist_ok=True)
+        with open(os.path.join(args.output, "frames.csv"), "w", encoding="utf-8") as f:
+            f.write("file,cycle,segment,duration_ms\n")
+            for i, (frame, delay) in enumerate(zip(frames, delays)):
+                name = f"frame_{i:05}.png"
+                write_png(os.path.join(args.output, name), render(frame, width, height, args.scale))
+                f.write(f"{name},{frame[0]},{frame[2]},{delay:.3f}\n")
+    else:
+        images = [render(frame, width, height, args.scale) for frame in frames]
+        if args.format == "apng":
+            write_apng(args.output, images, delays)
+        else:
+            write_gif(args.output, images, delays)
+
+    state = "HALT" if emulator.HALT else "limite de cycles"
+    print(f"{len(frames)} images uniques sur {end_cycle} cycles ({state}), segment final {emulator.segment_value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+from assembleur import OPCODES
+
+class Debugger:
+    def __init__(self, emulator, debug_info=None):
+        debug_info = debug_info or {}
+        self.emulator = emulator
+        self.labels = {k.upper(): v for k, v in debug_info.get("labels", {}).items()}
+        self.lines = {int(pc): line for pc, line in debug_info.get("lines", {}).items()}
+        self.breakpoints = set()
+        self.temporary = None
+        self.watches = {}
+        self.break_opcodes = set()
+        self.paused = False
+        self.resuming = False
+        self.stepping = False
+        self.reason = None
+        self.pauses = 0
+
+    def pc_for(self, where):
+        if isinstance(where, str):
+            name = where.strip().upper()
+            if name in self.labels:
+                return self.labels[name]
+            where = int(name, 0)
+        candidates = [pc for pc, line in self.lines.items() if line >= where]
+        if not candidates:
+            raise ValueError(f"Aucune instruction à partir de la ligne {where}")
+        return min(candidates, key=lambda pc: (self.lines[pc], pc))
+
+    def line_for(self, pc):
+        return self.lines.get(pc)
+
+    def add_breakpoint(self, where):
+        pc = self.pc_for(where)
+        self.breakpoints.add(pc)
+        return pc
+
+    def remove_breakpoint(self, where):
+        self.breakpoints.discard(self.pc_for(where))
+
+    def watch(self, name):
+        name = name.strip().upper()
+        self.watches[name] = self.read(name)
+
+    def unwatch(self, name):
+        self.watches.pop(name.strip().upper(), None)
+
+    def break_on(self, mnemonic):
+        self.break_opcodes.add(OPCODES[mnemonic.strip().upper()])
+
+    def read(self, name):
+        if name in self.emulator.FLAGS:
+            return self.emulator.FLAGS[name]
+        if name.startswith("R") and name[1:].isdigit() and int(name[1:]) < len(self.emulator.REG):
+            return self.emulator.REG[int(name[1:])]
+        raise ValueError(f"Registre ou drapeau inconnu : {name}")
+
+    def is_active(self):
+        return bool(self.breakpoints or self.watches or self.break_opcodes
+                    or self.temporary is not None or self.stepping or self.paused)
+
+    def pause(self, reason):
+        self.paused = True
+        self.pauses += 1
+        self.stepping = False
+        self.reason = reason
+
+    def resume(self):
+        self.paused = False
+        self.resuming = True
+
+    def step(self):
+        self.resume()
+        self.stepping = True
+
+    def run_to(self, where):
+        self.temporary = self.pc_for(where)
+        self.resume()
+
+    def before(self, pc):
+        if self.resuming:
+            return False
+        if pc == self.temporary:
+            self.temporary = None
+            self.pause("curseur atteint")
+            return True
+        if pc in self.breakpoints:
+            self.pause("point d'arrêt")
+            return True
+        return False
+
+    def after(self, opcode):
+        self.resuming = False
+        for name, old in self.watches.items():
+            value = self.read(name)
+            if value != old:
+                self.watches[name] = value
+                self.pause(f"{name} : {old} -> {value}")
+        if opcode in self.break_opcodes and not self.paused:
+            mnemonic = next(k for k, v in OPCODES.items() if v == opcode)
+            self.pause(mnemonic)
+        if self.stepping and not self.paused:
+            self.pause("pas à pas")
+        return self.paused
+
+    def status_lines(self):
+        emu = self.emulator
+        line = self.line_for(emu.PC)
+        # même numérotation que la gouttière de l'IDE, qui compte à partir de 0
+        where = f"PC={emu.PC}" + (f" ligne {line - 1}" if line else "")
+        lines = [self.reason or "pause", f"{where}  Z={emu.FLAGS['Z']} C={emu.FLAGS['C']}"]
+        for i in range(0, len(emu.REG), 4):
+            lines.append(" ".join(f"R{j}={emu.REG[j]}" for j in range(i, min(i + 4, len(emu.REG)))))
+        return lines
+
+    def status(self):
+        return " - ".join(self.status_lines())
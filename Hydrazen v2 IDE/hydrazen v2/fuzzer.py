@@ -0,0 +1,160 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+import headless
+from assembleur import assemble
+
+KEY_VALUES = [0, 1, 2, 3, 4]
+
+_worker = None
+
+def init_worker(rom, max_cycles, idle_limit):
+    global _worker
+    _worker = (headless.load_emulator(rom), rom, max_cycles, idle_limit)
+
+def run_case(case):
+    emulator, rom, max_cycles, idle_limit = _worker
+    headless.reset(emulator, rom)
+    emulator.REG[:] = case["regs"]
+    inputs = sorted(case["inputs"])
+    next_input = 0
+    edges = set()
+    # une seule entrée par (type, PC), comme dans main() : une boucle qui trace hors écran à chaque tour
+    # produirait sinon des milliers de tuples renvoyés par le pool
+    findings = {}
+    width, height = emulator.SCREEN_WIDTH, emulator.SCREEN_HEIGHT
+    rom_len = len(emulator.ROM)
+    last_output = 0
+    cycle = 0
+
+    while cycle < max_cycles:
+        while next_input < len(inputs) and inputs[next_input][0] <= cycle:
+            emulator.REG[15] = inputs[next_input][1]
+            next_input += 1
+        pc = emulator.PC
+        instr1 = emulator.ROM[pc % rom_len]
+        opcode = instr1 >> 4
+        if opcode == 0xE:
+            instr2 = emulator.ROM[(pc + 1) % rom_len]
+            x = emulator.REG[instr1 & 0xF]
+            y = emulator.REG[instr2 >> 4]
+            if (x >= width or y >= height) and ("plt_hors_ecran", pc) not in findings:
+                findings["plt_hors_ecran", pc] = ("plt_hors_ecran", pc, cycle, f"PLT en ({x}, {y})")
+        emulator.run_instruction()
+        cycle += 1
+        edges.add((pc, emulator.PC))
+        if opcode in (0xE, 0xF):
+            last_output = cycle
+        if emulator.HALT:
+            findings["halt", pc] = ("halt", pc, cycle, "HLT atteint")
+            break
+        if cycle - last_output > idle_limit:
+            findings["boucle_sans_sortie", pc] = ("boucle_sans_sortie", pc, cycle, f"aucun PLT/SEG depuis {idle_limit} cycles")
+            break
+
+    return case, edges, list(findings.values())
+
+def mutate(case, rng, max_cycles, fuzz_regs):
+    case = {"regs": list(case["regs"]), "inputs": [list(e) for e in case["inputs"]]}
+    for _ in range(rng.randint(1, 4)):
+        choice = rng.randrange(6 if fuzz_regs else 5)
+        events = case["inputs"]
+        if choice == 0 or not events:
+            value = rng.choice(KEY_VALUES) if rng.random() < 0.9 else rng.randrange(256)
+            events.append([rng.randrange(max_cycles), value])
+        elif choice == 1:
+            events.pop(rng.randrange(len(events)))
+        elif choice == 2:
+            e = rng.choice(events)
+            e[0] = max(0, min(max_cycles - 1, e[0] + rng.randint(-64, 64)))
+        elif choice == 3:
+            rng.choice(events)[1] = rng.choice(KEY_VALUES)
+        elif choice == 4:
+            start = rng.randrange(max_cycles)
+            value = rng.choice(KEY_VALUES)
+            events.extend([[start, value], [start + rng.randint(1, 200), 0]])
+        else:
+            r = rng.randrange(15)
+            case["regs"][r] = rng.choice([0, 1, 23, 24, 127, 128, 255, rng.randrange(256)])
+    case["inputs"].sort()
+    return case
+
+def save(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzzer guidé par la couverture pour les programmes Hydra2")
+    parser.add_argument("program")
+    parser.add_argument("-o", "--output", default="fuzz_out")
+    parser.add_argument("--time", type=float, default=60.0, help="durée en secondes")
+    parser.add_argument("--cycles", type=int, default=20000, help="cycles maximum par exécution")
+    parser.add_argument("--idle", type=int, default=5000, help="cycles sans PLT/SEG avant de signaler une boucle")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--halt-ok", action="store_true", help="ne pas signaler les HLT")
+    parser.add_argument("--no-regs", action="store_true", help="ne muter que les entrées R15")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--replay", help="rejoue un cas sauvegardé et affiche le résultat")
+    args = parser.parse_args()
+
+    with open(args.program, "r", encoding="utf-8", errors="ignore") as f:
+        debug_info = {}
+        rom = assemble(f.read(), debug_info)
+    lines = debug_info["lines"]
+
+    if args.replay:
+        with open(args.replay, "r", encoding="utf-8") as f:
+            case = json.load(f)
+        init_worker(rom, args.cycles, args.idle)
+        _, edges, findings = run_case(case)
+        print(f"{len(edges)} arêtes couvertes")
+        for kind, pc, cycle, detail in findings:
+            print(f"{kind} ligne {lines.get(pc, '?')} (PC={pc}) au cycle {cycle} : {detail}")
+        return
+
+    rng = random.Random(args.seed)
+    os.makedirs(os.path.join(args.output, "corpus"), exist_ok=True)
+    os.makedirs(os.path.join(args.output, "findings"), exist_ok=True)
+
+    corpus = [{"regs": [0] * 16, "inputs": []}]
+    coverage = set()
+    reported = set()
+    runs = 0
+    t0 = time.time()
+    batch_size = max(1, args.jobs) * 16
+
+    with multiprocessing.Pool(args.jobs, initializer=init_worker, initargs=(rom, args.cycles, args.idle)) as pool:
+        batch = list(corpus)
+        while time.time() - t0 < args.time:
+            for case, edges, findings in pool.imap_unordered(run_case, batch, chunksize=4):
+                runs += 1
+                new = edges - coverage
+                if new:
+                    coverage |= new
+                    corpus.append(case)
+                    save(os.path.join(args.output, "corpus", f"{len(corpus):05}.json"), case)
+                for kind, pc, cycle, detail in findings:
+                    if kind == "halt" and args.halt_ok:
+                        continue
+                    if (kind, pc) in reported:
+                        continue
+                    reported.add((kind, pc))
+                    name = f"{kind}_pc{pc}.json"
+                    save(os.path.join(args.output, "findings", name), case)
+                    print(f"[{time.time() - t0:6.1f}s] {kind} ligne {lines.get(pc, '?')} (PC={pc}) "
+                          f"au cycle {cycle} : {detail} -> {name}")
+            batch = [mutate(rng.choice(corpus), rng, args.cycles, not args.no_regs) for _ in range(batch_size)]
+
+    covered = {pc for pc, _ in coverage} & set(lines)
+    print(f"{runs} exécutions en {time.time() - t0:.1f}s sur {args.jobs} processus")
+    print(f"couverture : {len(covered)}/{len(lines)} instructions, {len(coverage)} arêtes, corpus de {len(corpus)} cas")
+    missing = sorted(lines[pc] for pc in set(lines) - covered)
+    if missing:
+        print("lignes jamais exécutées :", ", ".join(map(str, missing)))
+    print(f"{len(reported)} problèmes distincts sauvegardés dans {os.path.join(args.output, 'findings')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import importlib.util
+import os
+from assembleur import assemble
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+emulator_path = os.path.join(base_dir, "hydrazen v2.py")
+
+def load_emulator(rom=None):
+    # chaque appel crée une machine indépendante (ROM, registres, écran)
+    spec = importlib.util.spec_from_file_location("emulator", emulator_path)
+    emulator = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(emulator)
+    emulator.print = emulator.fakeprint
+    if rom is not None:
+        emulator.ROM = list(rom)
+    return emulator
+
+def load_program(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return assemble(f.read())
+
+def parse_inputs(text):
+    inputs = []
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        cycle, value = item.split(":", 1)
+        inputs.append((int(cycle, 0), int(value, 0) & 0xFF))
+    return sorted(inputs)
+
+def run(emulator, max_cycles, inputs=(), on_output=None):
+    inputs = sorted(inputs)
+    next_input = 0
+    while emulator.cycle_count < max_cycles and not emulator.HALT:
+        while next_input < len(inputs) and inputs[next_input][0] <= emulator.cycle_count:
+            emulator.REG[15] = inputs[next_input][1]
+            next_input += 1
+        plots = emulator.plt_count
+        segment = emulator.segment_value
+        emulator.run_instruction()
+        emulator.cycle_count += 1
+        if on_output and (plots != emulator.plt_count or segment != emulator.segment_value):
+            on_output(emulator.cycle_count)
+    return emulator.cycle_count
+
+def reset(emulator, rom=None):
+    if rom is not None:
+        emulator.ROM = list(rom)
+    emulator.REG[:] = [0] * len(emulator.REG)
+    emulator.FLAGS["Z"] = emulator.FLAGS["C"] = 0
+    emulator.PC = 0
+    emulator.HALT = False
+    for row in emulator.screen_buf:
+        row[:] = [0] * len(row)
+    emulator.segment_value = 0
+    emulator.plt_count = 0
+    emulator.cycle_count = 0
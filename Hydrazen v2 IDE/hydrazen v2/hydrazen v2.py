@@ -2,12 +2,14 @@ import pygame
 import sys
 import time
 import os
+from metrics import Metrics
 
 SCREEN_SCALE = 10
 SCREEN_WIDTH = 24
 SCREEN_HEIGHT = 24
 SEGMENT_HEIGHT = 100
 FPS = 60
+MAX_LAG = 0.25
 
 ROM = [0] * 256
 REG = [0] * 16
@@ -22,6 +24,8 @@ backupprint = print
 start = 0
 stop = 0
 cycle_count = 0
+plt_count = 0
+perf = None
 
 def fakeprint(*args): pass
 
@@ -35,7 +39,7 @@ def set_flag(val):
     FLAGS["C"] = int(val > 255 or val < 0)
 
 def run_instruction():
-    global PC, HALT, segment_value
+    global PC, HALT, segment_value, plt_count
     instr1 = ROM[PC % len(ROM)]
     instr2 = ROM[(PC + 1) % len(ROM)]
     opcode, operands = decode(instr1, instr2)
@@ -116,6 +120,7 @@ def run_instruction():
         x = REG[x_reg] % SCREEN_WIDTH
         y = REG[y_reg] % SCREEN_HEIGHT
         screen_buf[y][x] ^= 1
+        plt_count += 1
 
     elif opcode == 0xF:
         reg = (operands >> 8) & 0xF
@@ -151,60 +156,180 @@ def draw_segment(screen, value, font=None):
     text = font.render(f"{value:03}", True, LAMP_YELLOW)
     screen.blit(text, (10, SCREEN_HEIGHT * SCREEN_SCALE + 10))
 
-_input_state = {"down": False, "left": False, "up": False, "right": False}
-
-def update_input(events):
-    global REG, _input_state
-
-    for ev in events:
-        if ev.type == pygame.KEYDOWN:
-            if ev.key == pygame.K_DOWN:
-                _input_state["down"] = True
-            elif ev.key == pygame.K_LEFT:
-                _input_state["left"] = True
-            elif ev.key == pygame.K_UP:
-                _input_state["up"] = True
-            elif ev.key == pygame.K_RIGHT:
-                _input_state["right"] = True
-        elif ev.type == pygame.KEYUP:
-            if ev.key == pygame.K_DOWN:
-                _input_state["down"] = False
-            elif ev.key == pygame.K_LEFT:
-                _input_state["left"] = False
-            elif ev.key == pygame.K_UP:
-                _input_state["up"] = False
-            elif ev.key == pygame.K_RIGHT:
-                _input_state["right"] = False
-
-    try:
-        keys = pygame.key.get_pressed()
-        _input_state["down"]  = bool(keys[pygame.K_DOWN])  or _input_state["down"]
-        _input_state["left"]  = bool(keys[pygame.K_LEFT])  or _input_state["left"]
-        _input_state["up"]    = bool(keys[pygame.K_UP])    or _input_state["up"]
-        _input_state["right"] = bool(keys[pygame.K_RIGHT]) or _input_state["right"]
-    except Exception:
-        pass
+def draw_hud(screen, lines, font):
+    if not lines:
+        return
+    height = font.get_linesize()
+    width = max(font.size(line)[0] for line in lines) + 8
+    overlay = pygame.Surface((width, height * len(lines) + 6), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 170))
+    for i, line in enumerate(lines):
+        overlay.blit(font.render(line, True, LAMP_YELLOW), (4, 3 + i * height))
+    screen.blit(overlay, (0, 0))
 
+_input_state = {"down": False, "left": False, "up": False, "right": False}
+_input_keys = {pygame.K_DOWN: "down", pygame.K_LEFT: "left", pygame.K_UP: "up", pygame.K_RIGHT: "right"}
+_input_queue = []
+_latency_start = None
+_latency_shown = []
+input_latency_cycles = []
+input_latency_ms = []
+
+def input_value():
     if _input_state["down"]:
-        REG[15] = 3
+        return 3
     elif _input_state["left"]:
-        REG[15] = 2
+        return 2
     elif _input_state["up"]:
-        REG[15] = 1
+        return 1
     elif _input_state["right"]:
-        REG[15] = 4
-    else:
-        REG[15] = 0
+        return 4
+    return 0
 
-def main(hz=1000.0, debug=False):
-    global cycle_count,start,stop,backupprint, print
+def update_input(events):
+    for stamp, ev in events:
+        if ev.type in (pygame.KEYDOWN, pygame.KEYUP) and ev.key in _input_keys:
+            _input_state[_input_keys[ev.key]] = ev.type == pygame.KEYDOWN
+        elif ev.type == pygame.WINDOWFOCUSLOST:
+            for k in _input_state:
+                _input_state[k] = False
+        else:
+            continue
+        _input_queue.append((stamp, input_value()))
+
+def latch_input(now):
+    global _latency_start
+    while _input_queue and _input_queue[0][0] <= now:
+        stamp, value = _input_queue.pop(0)
+        if REG[15] != value:
+            REG[15] = value
+            _latency_start = (cycle_count, stamp)
+
+def input_reached_plt():
+    global _latency_start
+    input_latency_cycles.append(cycle_count - _latency_start[0])
+    _latency_shown.append(_latency_start[1])
+    _latency_start = None
+
+def wait_frame(deadline):
+    events = []
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        ev = pygame.event.wait(max(1, int(remaining * 1000)))
+        if ev.type == pygame.NOEVENT:
+            break
+        events.append((time.time(), ev))
+    return events
+
+def run_cycles(n, t, cycle_time):
+    global cycle_count, stop
+    for _ in range(n):
+        if _input_queue:
+            latch_input(t)
+        if HALT:
+            if not stop:
+                stop = time.time()
+        else:
+            plots = plt_count
+            run_instruction()
+            cycle_count += 1
+            if _latency_start and plt_count != plots:
+                input_reached_plt()
+        t += cycle_time
+    return t
+
+def run_cycles_debug(n, t, cycle_time, debugger):
+    global cycle_count, stop
+    for _ in range(n):
+        if _input_queue:
+            latch_input(t)
+        if HALT:
+            if not stop:
+                stop = time.time()
+        elif debugger.before(PC):
+            break
+        else:
+            opcode = ROM[PC % len(ROM)] >> 4
+            plots = plt_count
+            run_instruction()
+            cycle_count += 1
+            if _latency_start and plt_count != plots:
+                input_reached_plt()
+            if debugger.after(opcode):
+                return t + cycle_time
+        t += cycle_time
+    return t
+
+DEBUG_KEYS = {pygame.K_F5: "continue", pygame.K_F10: "step", pygame.K_F6: "pause"}
+
+def debug_command(debugger, command):
+    # mêmes commandes depuis le clavier de la fenêtre et depuis les boutons de l'IDE
+    if command == "continue" and debugger.paused:
+        debugger.resume()
+    elif command == "step" and debugger.paused:
+        debugger.step()
+    elif command == "pause" and not debugger.paused:
+        debugger.pause("pause manuelle")
+
+def handle_debug_keys(events, debugger):
+    for _, ev in events:
+        if ev.type == pygame.KEYDOWN and ev.key in DEBUG_KEYS:
+            debug_command(debugger, DEBUG_KEYS[ev.key])
+
+def handle_hud_keys(events, hud):
+    for _, ev in events:
+        if ev.type == pygame.KEYDOWN and ev.key == pygame.K_F3:
+            hud = not hud
+    return hud
+
+def patch_rom(changes, size, pc_map=None):
+    global PC, HALT, stop, start, segment_value, plt_count, cycle_count
+    if size != len(ROM):
+        ROM[:] = (ROM + [0] * size)[:size]
+    for addr, value in changes:
+        ROM[addr] = value
+    if HALT:
+        # un programme terminé repart de zéro avec la nouvelle ROM, comme un nouveau lancement
+        # (PLT inverse les pixels : garder l'ancien écran effacerait ce qui est redessiné)
+        REG[:] = [0] * len(REG)
+        FLAGS["Z"] = FLAGS["C"] = 0
+        for row in screen_buf:
+            row[:] = [0] * len(row)
+        segment_value = 0
+        plt_count = 0
+        cycle_count = 0
+        HALT = False
+        start = time.time()
+        stop = 0
+        PC = 0
+    elif pc_map:
+        PC = pc_map.get(PC, PC)
+    if ROM:
+        PC %= len(ROM)
+
+def poll_control(control, debugger=None):
+    try:
+        while control.poll():
+            msg = control.recv()
+            if "patch" in msg:
+                patch_rom(msg["patch"], msg["size"], msg.get("pc_map"))
+                backupprint(f"ROM rechargée : {len(msg['patch']) // 2} mots modifiés, PC={PC}")
+            elif "debug" in msg and debugger:
+                debug_command(debugger, msg["debug"])
+    except (EOFError, OSError):
+        return None
+    return control
+
+def main(hz=1000.0, debug=False, debugger=None, control=None, metrics=None, metrics_out=None, hud=False):
+    global cycle_count,start,stop,backupprint, print, perf
     if not debug:
         backupprint = print
         print = fakeprint
 
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH * SCREEN_SCALE, SCREEN_HEIGHT * SCREEN_SCALE + SEGMENT_HEIGHT))
-    clock = pygame.time.Clock()
     pygame.display.set_caption("Hydrazen v2")
 
     icon_path = os.path.join(os.path.dirname(__file__), "icone", "hydrazen_icone.ico")  # PNG recommandé
@@ -216,40 +341,89 @@ def main(hz=1000.0, debug=False):
         font = pygame.font.SysFont("Courier", 48, bold=True)
     except Exception:
         font = pygame.font.Font(None, 48)
+    hud_font = pygame.font.Font(None, 18)
+
+    perf = metrics if metrics is not None else Metrics(hz)
+    if metrics_out:
+        perf.output = metrics_out
+    max_burst = max(1, int(hz * MAX_LAG))
 
     cycle_time = 1.0 / hz
     cycle_count = 0
     last_cycle = time.time()
     start = time.time()
     stop = 0
+    events = []
+    shown_pauses = 0
+    paused_caption = False
 
     try:
         while True:
-           
-            events = pygame.event.get()
-            for event in events:
+            frame_start = time.time()
+            events += [(frame_start, ev) for ev in pygame.event.get()]
+            for _, event in events:
                 if event.type == pygame.QUIT:
                     end()
 
             update_input(events)
+            hud = handle_hud_keys(events, hud)
+            if control is not None:
+                control = poll_control(control, debugger)
+            if debugger:
+                handle_debug_keys(events, debugger)
+            events = []
 
             now = time.time()
             cycles_to_run = int((now - last_cycle) / cycle_time)
-
-            for _ in range(cycles_to_run):
-                if HALT:
-                    if not stop:
-                        stop = time.time()
-                else:
-                    run_instruction()
-                    cycle_count += 1
-                last_cycle += cycle_time
-
+            # si l'hôte ne suit pas, on abandonne le retard au lieu de le rattraper indéfiniment
+            dropped = 0
+            if cycles_to_run > max_burst:
+                dropped = cycles_to_run - max_burst
+                cycles_to_run = max_burst
+                last_cycle += dropped * cycle_time
+            cycles_before = cycle_count
+
+            # les touches sont appliquées au cycle qui correspond à leur arrivée, pas au début de la rafale
+            if not _input_queue:
+                REG[15] = input_value()
+            # sans point d'arrêt actif, la boucle d'exécution ne fait aucune vérification
+            if debugger is None or not debugger.is_active():
+                last_cycle = run_cycles(cycles_to_run, last_cycle, cycle_time)
+            elif not debugger.paused:
+                last_cycle = run_cycles_debug(max(1, cycles_to_run) if debugger.stepping else cycles_to_run,
+                                              last_cycle, cycle_time, debugger)
+
+            if debugger and debugger.paused:
+                last_cycle = now
+                if debugger.pauses != shown_pauses:
+                    pygame.display.set_caption(f"Hydrazen v2 - {debugger.reason} (F10 pas, F5 continuer)")
+                    backupprint(debugger.status())
+                    shown_pauses = debugger.pauses
+                    paused_caption = True
+            elif paused_caption:
+                pygame.display.set_caption("Hydrazen v2")
+                paused_caption = False
+
+            emu_done = time.time()
             screen.fill(LAMP_BROWN)
             draw_screen(screen)
             draw_segment(screen, segment_value, font)
+            overlay = perf.hud_lines() if hud else []
+            if debugger and debugger.paused:
+                # l'état est affiché dans la fenêtre : sous Windows, la console de l'émulateur est masquée
+                overlay = overlay + debugger.status_lines()
+            draw_hud(screen, overlay, hud_font)
             pygame.display.flip()
-            clock.tick(FPS)
+
+            shown = time.time()
+            for stamp in _latency_shown:
+                input_latency_ms.append((shown - stamp) * 1000)
+            _latency_shown.clear()
+
+            events = wait_frame(frame_start + 1.0 / FPS)
+            frame_end = time.time()
+            perf.frame(cycle_count - cycles_before, dropped, emu_done - now, shown - emu_done,
+                       frame_end - shown, frame_end - frame_start)
     except KeyboardInterrupt:
         end()
 
@@ -261,6 +435,12 @@ def end():
         backupprint(f"{cycle_count} cycles exécutés en {stop-start} secondes, moyenne {cycle_count / (stop-start)} cycles par seconde")
     except Exception:
         print(f"{cycle_count} cycles exécutés en {stop-start} secondes")
+    if input_latency_cycles:
+        backupprint(f"latence entrée -> PLT : moyenne {sum(input_latency_cycles) / len(input_latency_cycles):.1f} cycles "
+                    f"(max {max(input_latency_cycles)}), {sum(input_latency_ms) / max(1, len(input_latency_ms)):.1f} ms jusqu'à l'affichage")
+    if perf:
+        backupprint(perf.summary())
+        perf.close()
     pygame.quit()
     sys.exit()
 
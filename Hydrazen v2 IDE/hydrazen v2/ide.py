@@ -1,143 +1,23 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import musique.musique as music_player
+from assembleur import OPCODES, assemble
+from debugger import Debugger
+from preview import EmulatorPreview
+from speculation import Speculator
+from multiprocessing.connection import Client, Listener
 import subprocess
+import threading
+import difflib
+import itertools
 import re
 import sys
 import os
 
-OPCODES = {
-    'NOP': 0x0,
-    'HLT': 0x1,
-    'ADD': 0x2,
-    'SUB': 0x3,
-    'AND': 0x4,
-    'OR':  0x5,
-    'XOR': 0x6,
-    'NOR': 0x7,
-    'JMP': 0x8,
-    'RSH': 0x9,
-    'LSH': 0xA,
-    'LDI': 0xB,
-    'ADI': 0xC,
-    'BRZ': 0xD,
-    'PLT': 0xE,
-    'SEG': 0xF
-}
-
 def print_list_hex(lst):
     for item in lst:
         print(hex(item))
 
-def reg_num_token(tok):
-    return int(tok.strip().upper().replace("R", ""))
-
-def assemble(asm):
-    lines = []
-    for raw_line in asm.splitlines():
-        line = raw_line.split(";", 1)[0].strip()
-        lines.append(line.upper())
-
-    labels = {}
-    pc = 0
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        if ":" in line:
-            label, rest = line.split(":", 1)
-            labels[label.strip()] = pc
-            line = rest.strip()
-            if not line:
-                continue
-        pc += 2
-
-    rom = []
-    for lineno, line in enumerate(lines, 1):
-        line = line.strip()
-        if not line:
-            continue
-        if ":" in line:
-            _, line = line.split(":", 1)
-            line = line.strip()
-            if not line:
-                continue
-
-        parts = line.split()
-        if not parts:
-            continue
-
-        instr = parts[0]
-        opcode = OPCODES.get(instr)
-        if opcode is None:
-            raise ValueError(f"Line {lineno}: Unknown instruction: {instr}")
-
-        try:
-            operands_str = line[len(instr):].strip()
-            operands = [op.strip() for op in operands_str.split(",") if op.strip()]
-
-            if instr in ('ADD', 'SUB', 'AND', 'OR', 'XOR', 'NOR'):
-                if len(operands) != 3:
-                    raise ValueError(f"Line {lineno}: Expected 3 operands")
-                a, b, c = map(reg_num_token, operands)
-                opval = (a << 8) | (b << 4) | c
-
-            elif instr in ('RSH', 'LSH'):
-                if len(operands) != 3:
-                    raise ValueError(f"Line {lineno}: Expected 3 operands")
-                a = reg_num_token(operands[0])
-                c = reg_num_token(operands[2])
-                opval = (a << 8) | c
-
-            elif instr in ('LDI', 'ADI'):
-                if len(operands) != 2:
-                    raise ValueError(f"Line {lineno}: Expected 2 operands")
-                r = reg_num_token(operands[0])
-                val_tok = operands[1].upper()
-                if re.match(r'^[A-Z_][A-Z0-9_]*$', val_tok) and val_tok in labels:
-                    val = labels[val_tok]
-                else:
-                    val = int(val_tok, 0)
-                opval = (r << 8) | (val & 0xFF)
-
-            elif instr == 'SEG':
-                if len(operands) != 1:
-                    raise ValueError(f"Line {lineno}: Expected 1 operand")
-                r = reg_num_token(operands[0])
-                opval = (r << 8)
-
-            elif instr in ('JMP', 'BRZ'):
-                if len(operands) != 1:
-                    raise ValueError(f"Line {lineno}: Expected 1 operand")
-                arg = operands[0].upper()
-                if re.match(r'^[A-Z_][A-Z0-9_]*$', arg) and arg in labels:
-                    addr = labels[arg]
-                else:
-                    addr = int(arg, 0)
-                opval = addr & 0xFF
-
-            elif instr == 'PLT':
-                if len(operands) != 2:
-                    raise ValueError(f"Line {lineno}: Expected 2 operands")
-                x, y = map(reg_num_token, operands)
-                opval = (x << 8) | (y << 4)
-
-            elif instr in ('NOP', 'HLT'):
-                opval = 0
-
-            else:
-                raise ValueError(f"Line {lineno}: Invalid syntax")
-
-            byte1 = (opcode << 4) | ((opval >> 8) & 0xF)
-            byte2 = opval & 0xFF
-            rom.append(byte1)
-            rom.append(byte2)
-
-        except Exception as e:
-            raise ValueError(f"Line {lineno}: {e}")
-
-    return rom
-
 root = tk.Tk()
 root.title("Hydra2 IDE")
 
@@ -161,6 +41,7 @@ linenumbers = tk.Text(liner_frame, width=5, padx=4, pady=4, bd=0, takefocus=0,
                       bg="#252526", fg="#858585", relief=tk.FLAT, font=line_font,
                       state=tk.DISABLED)
 linenumbers.pack(fill=tk.Y, expand=False)
+linenumbers.tag_configure("breakpoint", background="#6e1b1b", foreground="#ffffff")
 
 editor = tk.Text(root, wrap=tk.NONE, font=("Courier", 12), bg=EDITOR_BG, fg=EDITOR_FG,
                  insertbackground=EDITOR_FG, selectbackground=SELECTION_BG, selectforeground="#ffffff",
@@ -180,6 +61,20 @@ editor.tag_configure("nib3", foreground="#6A9955")
 editor.tag_configure("nib4", foreground="#569CD6")
 
 MAX_LINES = 64
+# les points d'arrêt sont des marques du texte : elles suivent les lignes quand on édite au-dessus
+breakpoint_ids = itertools.count()
+
+def breakpoint_marks():
+    return [m for m in editor.mark_names() if str(m).startswith("breakpoint_")]
+
+def breakpoint_lines():
+    return {int(editor.index(m).split(".")[0]) for m in breakpoint_marks()}
+
+def set_breakpoints(lines):
+    for m in breakpoint_marks():
+        editor.mark_unset(m)
+    for line in lines:
+        editor.mark_set(f"breakpoint_{next(breakpoint_ids)}", f"{line}.0")
 
 def enforce_line_limit():
     try:
@@ -216,8 +111,27 @@ def update_line_numbers(event=None):
     linenumbers.config(state=tk.NORMAL)
     linenumbers.delete("1.0", tk.END)
     linenumbers.insert("1.0", lines)
+    for line in breakpoint_lines():
+        if first_vis <= line <= last_vis:
+            row = line - first_vis + 1
+            linenumbers.tag_add("breakpoint", f"{row}.0", f"{row}.end")
     linenumbers.config(state=tk.DISABLED)
 
+def toggle_breakpoint(event):
+    try:
+        first_vis = int(editor.index("@0,0").split(".")[0])
+        row = int(linenumbers.index(f"@{event.x},{event.y}").split(".")[0])
+    except Exception:
+        return "break"
+    line = first_vis + row - 1
+    lines = breakpoint_lines()
+    if line in lines:
+        set_breakpoints(lines - {line})
+    else:
+        set_breakpoints(lines | {line})
+    update_line_numbers()
+    return "break"
+
 def highlight_syntax(event=None):
     content = editor.get("1.0", "end-1c")
     for t in ("opcode", "reg", "number", "comment", "label"):
@@ -382,8 +296,10 @@ def convert_to_binary():
         groups = [ln[i:i+4] for i in range(0, 16, 4)]
         grouped_lines.append(" ".join(groups))
 
+    kept = breakpoint_lines()
     editor.delete("1.0", tk.END)
     editor.insert(tk.END, "\n".join(grouped_lines))
+    set_breakpoints(kept)
 
     apply_nibble_tags()
     highlight_syntax()
@@ -406,7 +322,124 @@ def apply_nibble_tags():
             end = f"{line_idx}.0+{off+4}c"
             editor.tag_add(tag, start, end)
 
-def run_emulator(rom_bytes=None, speed=60.0, debug=False):
+emulator_session = {"mode": None, "process": None, "conn": None, "rom": None, "debug_info": None, "source": None,
+                    "debug": False, "listener": None}
+
+def stop_control_listener():
+    pending = emulator_session["listener"]
+    emulator_session["listener"] = None
+    if emulator_session["conn"] is not None:
+        emulator_session["conn"].close()
+        emulator_session["conn"] = None
+    elif pending is not None:
+        # accept() ne se réveille pas quand on ferme l'écoute : on s'y connecte pour libérer le thread
+        address, authkey = pending
+        try:
+            Client(address, authkey=authkey).close()
+        except (OSError, EOFError):
+            pass
+
+def start_control_listener():
+    stop_control_listener()
+    authkey = os.urandom(16)
+    listener = Listener(("127.0.0.1", 0), authkey=authkey)
+    pending = (listener.address, authkey)
+    emulator_session["listener"] = pending
+
+    def accept():
+        try:
+            conn = listener.accept()
+        except (OSError, EOFError):
+            return
+        finally:
+            listener.close()
+        # une connexion qui arrive après un nouveau lancement appartient à l'ancien processus
+        if emulator_session["listener"] is pending:
+            emulator_session["conn"] = conn
+        else:
+            conn.close()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return pending
+
+def remap_pcs(old_info, new_info, old_source, new_source):
+    # PC ancien -> ligne ancienne -> ligne nouvelle (alignement des sources) -> PC nouveau
+    line_map = {}
+    matcher = difflib.SequenceMatcher(None, [l.strip() for l in old_source], [l.strip() for l in new_source])
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal" or (tag == "replace" and i2 - i1 == j2 - j1):
+            for k in range(i2 - i1):
+                line_map[i1 + k + 1] = j1 + k + 1
+    new_pc_of_line = {line: pc for pc, line in new_info["lines"].items()}
+    pc_map = {}
+    for pc, line in old_info["lines"].items():
+        new_pc = new_pc_of_line.get(line_map.get(line))
+        if new_pc is not None and new_pc != pc:
+            pc_map[pc] = new_pc
+    return pc_map
+
+def hot_reload(rom, debug_info, source):
+    session = emulator_session
+    # une session de débogage garde ses points d'arrêt sur l'ancienne ROM : on relance plutôt
+    if not hot_reload_var.get() or session["rom"] is None or session["debug"]:
+        return False
+    if session["mode"] == "preview":
+        if not preview_var.get() or not preview.running():
+            return False
+    elif session["conn"] is None or session["process"] is None or session["process"].poll() is not None:
+        return False
+    old = session["rom"]
+    changes = []
+    for addr in range(0, len(rom), 2):
+        if rom[addr:addr + 2] != old[addr:addr + 2]:
+            changes += [(addr, rom[addr]), (addr + 1, rom[addr + 1])]
+    # programme inchangé : "Assemble & Run" doit relancer, pas envoyer un correctif vide
+    if not changes and len(rom) == len(old):
+        return False
+    pc_map = remap_pcs(session["debug_info"], debug_info, session["source"], source)
+    if session["mode"] == "preview":
+        preview.patch(changes, len(rom), pc_map)
+    else:
+        try:
+            session["conn"].send({"patch": changes, "size": len(rom), "pc_map": pc_map})
+        except (OSError, ValueError):
+            return False
+    session.update(rom=list(rom), debug_info=debug_info, source=source)
+    return True
+
+def check_debug_targets(debug_info, run_to):
+    # une ligne invalide ferait planter le processus de l'émulateur sans message : on vérifie ici
+    resolver = Debugger(None, debug_info)
+    valid, invalid = [], []
+    for line in sorted(breakpoint_lines()):
+        try:
+            resolver.pc_for(line)
+            valid.append(line)
+        except ValueError:
+            invalid.append(line)
+    if invalid:
+        set_breakpoints(valid)
+        update_line_numbers()
+        messagebox.showwarning("Points d'arrêt ignorés",
+                               "Aucune instruction à partir des lignes " + ", ".join(str(l - 1) for l in invalid))
+    watches = []
+    for name in watch_entry.get().split(","):
+        name = name.strip().upper()
+        if not name:
+            continue
+        if name in ("Z", "C") or (name[:1] == "R" and name[1:].isdigit() and int(name[1:]) < 16):
+            watches.append(name)
+        else:
+            messagebox.showwarning("Surveillance ignorée", f"Registre ou drapeau inconnu : {name}")
+    if run_to is not None:
+        try:
+            resolver.pc_for(run_to)
+        except ValueError:
+            messagebox.showerror("Exécuter jusqu'au curseur", f"Aucune instruction à partir de la ligne {run_to - 1}")
+            return None
+    return valid, watches
+
+def run_emulator(rom_bytes=None, speed=60.0, debug=False, debug_info=None, run_to=None, breakpoints=(), watches=()):
     base_dir = os.path.dirname(os.path.abspath(__file__))
     runner_path = os.path.join(base_dir, "_temp_emulator_runner.py")
     emulator_path = os.path.join(base_dir, "hydrazen v2.py")
@@ -421,29 +454,82 @@ def run_emulator(rom_bytes=None, speed=60.0, debug=False):
         f.write("spec.loader.exec_module(emulator)\n")
         if rom_bytes is not None:
             f.write(f"emulator.ROM = {list(rom_bytes)}\n")
-        f.write("emulator.main(60.0, debug=False)\n")
+        address, authkey = start_control_listener()
+        f.write("from multiprocessing.connection import Client\n")
+        f.write(f"control = Client({address!r}, authkey={authkey!r})\n")
+        if debug and debug_info is not None:
+            f.write("import sys\n")
+            f.write("sys.path.insert(0, base_dir)\n")
+            f.write("from debugger import Debugger\n")
+            f.write(f"debugger = Debugger(emulator, {debug_info!r})\n")
+            for line in breakpoints:
+                f.write(f"debugger.add_breakpoint({line})\n")
+            for name in watches:
+                f.write(f"debugger.watch({name!r})\n")
+            for mnemonic, var in break_vars.items():
+                if var.get():
+                    f.write(f"debugger.break_on({mnemonic!r})\n")
+            if run_to is not None:
+                f.write(f"debugger.run_to({run_to})\n")
+        metrics_args = ""
+        if metrics_var.get():
+            metrics_args = f", metrics_out={os.path.join(base_dir, 'metrics.csv')!r}"
+        if debug and debug_info is not None:
+            f.write(f"emulator.main(60.0, debug=False, debugger=debugger, control=control{metrics_args})\n")
+        else:
+            f.write(f"emulator.main(60.0, debug=False, control=control{metrics_args})\n")
 
     creationflags = 0
     if sys.platform == "win32":
         creationflags = subprocess.CREATE_NO_WINDOW
 
-    subprocess.Popen([sys.executable, runner_path], creationflags=creationflags)
+    emulator_session["process"] = subprocess.Popen([sys.executable, runner_path], creationflags=creationflags)
 
-def on_assemble():
+def on_assemble(run_to=None):
     try:
         asm = editor.get("1.0", tk.END)
-        rom = assemble(asm)
+        debug_info = {}
+        rom = assemble(asm, debug_info)
         speed = float(speed_entry.get())
-        run_emulator(rom, speed, debug_var.get())
+        debug = debug_var.get() or run_to is not None
+        source = asm.splitlines()
+        if not debug and hot_reload(rom, debug_info, source):
+            return
+        if preview_var.get() and not debug:
+            preview.start(rom, speed)
+            mode = "preview"
+        else:
+            targets = check_debug_targets(debug_info, run_to) if debug else ([], [])
+            if targets is None:
+                return
+            run_emulator(rom, speed, debug, debug_info, run_to, *targets)
+            mode = "process"
+        emulator_session.update(mode=mode, rom=list(rom), debug_info=debug_info, source=source, debug=debug)
     except Exception as e:
         messagebox.showerror("Assembly Error", str(e))
 
+def on_run_to_cursor():
+    on_assemble(run_to=int(editor.index(tk.INSERT).split(".")[0]))
+
+def send_debug_command(command):
+    # pas à pas, reprise et pause passent par la connexion de contrôle de la session de débogage
+    session = emulator_session
+    if (not session["debug"] or session["conn"] is None or session["process"] is None
+            or session["process"].poll() is not None):
+        messagebox.showinfo("Debug", "Aucune session de débogage en cours : lancez avec Debug Mode ou Run to cursor.")
+        return
+    try:
+        session["conn"].send({"debug": command})
+    except (OSError, ValueError):
+        messagebox.showinfo("Debug", "La fenêtre de l'émulateur a été fermée.")
+
 def on_open():
     path = filedialog.askopenfilename(filetypes=[("Hydra2 files", "*.hydra2"), ("All files", "*.*")])
     if path:
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
             editor.delete("1.0", tk.END)
             editor.insert(tk.END, f.read())
+        set_breakpoints(())
         enforce_line_limit()
         highlight_syntax()
         update_line_numbers()
@@ -502,6 +588,88 @@ debug_check = tk.Checkbutton(
 )
 debug_check.pack(side=tk.LEFT, padx=6)
 
+debug_bar = tk.Frame(root, bg=ROOT_BG, padx=8, pady=2)
+debug_bar.pack(fill=tk.X)
+
+tk.Button(debug_bar, text="Run to cursor", command=on_run_to_cursor, **btn_opts).pack(side=tk.LEFT, padx=6)
+tk.Button(debug_bar, text="Step", command=lambda: send_debug_command("step"), **btn_opts).pack(side=tk.LEFT, padx=(0,6))
+tk.Button(debug_bar, text="Continue", command=lambda: send_debug_command("continue"), **btn_opts).pack(side=tk.LEFT, padx=(0,6))
+tk.Button(debug_bar, text="Pause", command=lambda: send_debug_command("pause"), **btn_opts).pack(side=tk.LEFT, padx=(0,6))
+
+watch_label = tk.Label(debug_bar, text="Watch:", bg=ROOT_BG, fg=EDITOR_FG)
+watch_label.pack(side=tk.LEFT, padx=(16,4))
+watch_entry = tk.Entry(debug_bar, width=12, bg="#2b2b2b", fg=EDITOR_FG, insertbackground=EDITOR_FG)
+watch_entry.pack(side=tk.LEFT, padx=(0,8))
+
+break_vars = {}
+for mnemonic in ("PLT", "SEG", "HLT"):
+    break_vars[mnemonic] = tk.BooleanVar()
+    tk.Checkbutton(
+        debug_bar,
+        text=f"Break {mnemonic}",
+        variable=break_vars[mnemonic],
+        bg=ROOT_BG,
+        fg=EDITOR_FG,
+        activebackground=ROOT_BG,
+        activeforeground=EDITOR_FG,
+        selectcolor=CHECK_BG,
+        bd=0
+    ).pack(side=tk.LEFT, padx=6)
+
+metrics_var = tk.BooleanVar(value=False)
+
+metrics_check = tk.Checkbutton(
+    debug_bar,
+    text="Export metrics",
+    variable=metrics_var,
+    bg=ROOT_BG,
+    fg=EDITOR_FG,
+    activebackground=ROOT_BG,
+    activeforeground=EDITOR_FG,
+    selectcolor=CHECK_BG,
+    bd=0
+)
+metrics_check.pack(side=tk.LEFT, padx=6)
+
+preview = EmulatorPreview(root)
+preview_var = tk.BooleanVar(value=False)
+
+def toggle_preview():
+    if preview_var.get():
+        preview.frame.pack(side=tk.RIGHT, fill=tk.Y, before=vscroll)
+    else:
+        preview.stop()
+        preview.frame.pack_forget()
+
+preview_check = tk.Checkbutton(
+    toolbar,
+    text="Embedded preview",
+    variable=preview_var,
+    command=toggle_preview,
+    bg=ROOT_BG,
+    fg=EDITOR_FG,
+    activebackground=ROOT_BG,
+    activeforeground=EDITOR_FG,
+    selectcolor=CHECK_BG,
+    bd=0
+)
+preview_check.pack(side=tk.LEFT, padx=6)
+
+hot_reload_var = tk.BooleanVar(value=True)
+
+hot_reload_check = tk.Checkbutton(
+    toolbar,
+    text="Hot Reload",
+    variable=hot_reload_var,
+    bg=ROOT_BG,
+    fg=EDITOR_FG,
+    activebackground=ROOT_BG,
+    activeforeground=EDITOR_FG,
+    selectcolor=CHECK_BG,
+    bd=0
+)
+hot_reload_check.pack(side=tk.LEFT, padx=6)
+
 music_var = tk.BooleanVar(value=False)
 
 def toggle_music():
@@ -524,6 +692,57 @@ music_check = tk.Checkbutton(
 )
 music_check.pack(side=tk.LEFT, padx=6)
 
+status_bar = tk.Frame(root, bg="#252526", padx=8, pady=4)
+status_bar.pack(side=tk.BOTTOM, fill=tk.X, before=vscroll)
+
+THUMB_SCALE = 2
+status_thumb = tk.PhotoImage(width=24 * THUMB_SCALE, height=24 * THUMB_SCALE)
+tk.Label(status_bar, image=status_thumb, bg="#000000", bd=0).pack(side=tk.LEFT, padx=(0, 8))
+status_label = tk.Label(status_bar, text="", bg="#252526", fg=EDITOR_FG, anchor="w", font=("Courier", 10))
+status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+speculate_var = tk.BooleanVar(value=True)
+
+def show_speculation(result):
+    if "error" in result:
+        status_label.config(text=result["error"], fg="#f44747")
+        status_thumb.blank()
+        return
+    end = f"HLT au cycle {result['cycles']}" if result["halted"] else f"pas de HLT après {result['cycles']} cycles"
+    status_label.config(text=f"{end}  -  segment {result['segment']:03}", fg=EDITOR_FG)
+    rows = []
+    for row in result["screen"]:
+        line = "{" + " ".join(("#ffeb67" if px else "#000000") for px in row for _ in range(THUMB_SCALE)) + "}"
+        rows.extend([line] * THUMB_SCALE)
+    status_thumb.put(" ".join(rows))
+
+speculator = Speculator(root, show_speculation)
+
+def schedule_speculation():
+    if speculate_var.get():
+        speculator.schedule(editor.get("1.0", "end-1c"))
+
+def toggle_speculation():
+    if speculate_var.get():
+        schedule_speculation()
+    else:
+        speculator.cancel()
+        status_label.config(text="")
+        status_thumb.blank()
+
+tk.Checkbutton(
+    status_bar,
+    text="Speculative run",
+    variable=speculate_var,
+    command=toggle_speculation,
+    bg="#252526",
+    fg=EDITOR_FG,
+    activebackground="#252526",
+    activeforeground=EDITOR_FG,
+    selectcolor=CHECK_BG,
+    bd=0
+).pack(side=tk.RIGHT)
+
 icon_path = os.path.join(os.path.dirname(__file__), "icone", "hydrazen_icone.ico")
 
 try:
@@ -533,11 +752,13 @@ except Exception as e:
 
 editor.bind("<KeyRelease>", lambda e: (highlight_syntax(), enforce_line_limit(), update_line_numbers()))
 editor.bind("<ButtonRelease-1>", update_line_numbers)
+linenumbers.bind("<Button-1>", toggle_breakpoint)
 editor.bind("<Configure>", lambda e: (highlight_syntax(), enforce_line_limit(), update_line_numbers()))
-editor.bind("<<Modified>>", lambda e=None: (highlight_syntax(), enforce_line_limit(), update_line_numbers(), editor.edit_modified(False)))
+editor.bind("<<Modified>>", lambda e=None: (highlight_syntax(), enforce_line_limit(), update_line_numbers(), schedule_speculation(), editor.edit_modified(False)))
 
 highlight_syntax()
 update_line_numbers()
+schedule_speculation()
 
 editor.config(
     insertbackground="#5a5a5a",
@@ -546,4 +767,5 @@ editor.config(
     insertontime=300
 )
 
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    root.mainloop()
@@ -0,0 +1,98 @@
+import collections
+import csv
+import json
+import statistics
+import time
+
+FIELDS = ["time", "cycles", "target_hz", "effective_hz", "emu_ms", "render_ms", "wait_ms", "frame_ms",
+          "jitter_ms", "dropped"]
+
+class Metrics:
+    def __init__(self, hz, output=None, window=60):
+        self.hz = hz
+        self.window = collections.deque(maxlen=window)
+        self.counters = {}
+        self.hooks = []
+        self.start = time.time()
+        self.total_cycles = 0
+        self.total_dropped = 0
+        self.frames = 0
+        self.last = None
+        self.output = output
+        self._file = None
+        self._writer = None
+
+    def add_counter(self, name, fn):
+        # fn() est appelée à chaque image, sa valeur est ajoutée à l'enregistrement
+        if self._writer is not None and name not in self.counters:
+            # l'en-tête CSV est déjà écrit : refuser ici plutôt que d'échouer à l'image suivante
+            raise ValueError(f"Compteur {name} ajouté après le début de l'écriture de {self.output}")
+        self.counters[name] = fn
+
+    def add_hook(self, fn):
+        # fn(record) est appelée à chaque image avec l'enregistrement complet
+        self.hooks.append(fn)
+
+    def frame(self, cycles, dropped, emu_time, render_time, wait_time, frame_time):
+        self.frames += 1
+        self.total_cycles += cycles
+        self.total_dropped += dropped
+        self.window.append((cycles, frame_time))
+
+        elapsed = sum(f for _, f in self.window)
+        frame_times = [f for _, f in self.window]
+        record = {
+            "time": round(time.time() - self.start, 4),
+            "cycles": cycles,
+            "target_hz": self.hz,
+            "effective_hz": round(sum(c for c, _ in self.window) / elapsed, 2) if elapsed else 0.0,
+            "emu_ms": round(emu_time * 1000, 3),
+            "render_ms": round(render_time * 1000, 3),
+            "wait_ms": round(wait_time * 1000, 3),
+            "frame_ms": round(frame_time * 1000, 3),
+            "jitter_ms": round(statistics.pstdev(frame_times) * 1000, 3) if len(frame_times) > 1 else 0.0,
+            "dropped": dropped,
+        }
+        for name, fn in self.counters.items():
+            record[name] = fn()
+        self.last = record
+        if self.output:
+            self.write(record)
+        for hook in self.hooks:
+            hook(record)
+        return record
+
+    def write(self, record):
+        if self._file is None:
+            self._file = open(self.output, "w", encoding="utf-8", newline="")
+            if self.output.lower().endswith(".csv"):
+                self._writer = csv.DictWriter(self._file, fieldnames=FIELDS + list(self.counters))
+                self._writer.writeheader()
+        if self._writer:
+            self._writer.writerow(record)
+        else:
+            self._file.write(json.dumps(record) + "\n")
+
+    def hud_lines(self):
+        r = self.last
+        if not r:
+            return []
+        lines = [
+            f"{r['effective_hz']:.0f} / {r['target_hz']:.0f} Hz",
+            f"{r['cycles']} cycles/image",
+            f"emu {r['emu_ms']:.2f} ms  rendu {r['render_ms']:.2f} ms",
+            f"image {r['frame_ms']:.1f} ms  gigue {r['jitter_ms']:.2f} ms",
+            f"cycles abandonnés {self.total_dropped}",
+        ]
+        lines += [f"{name} {r[name]}" for name in self.counters]
+        return lines
+
+    def summary(self):
+        elapsed = time.time() - self.start
+        return (f"{self.frames} images, {self.total_cycles / elapsed if elapsed else 0:.1f} Hz effectifs "
+                f"pour {self.hz} Hz visés, {self.total_dropped} cycles abandonnés")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
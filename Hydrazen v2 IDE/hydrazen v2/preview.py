@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+import tkinter as tk
+import headless
+
+SCALE = 8
+REFRESH_MS = 16
+MAX_LAG = 0.25
+LAMP_BROWN = "#000000"
+LAMP_YELLOW = "#ffeb67"
+KEY_VALUES = {"Down": 3, "Left": 2, "Up": 1, "Right": 4}
+
+class EmulatorPreview:
+    def __init__(self, parent, scale=SCALE):
+        self.scale = scale
+        self.frame = tk.Frame(parent, bg="#000000", padx=6, pady=6)
+        self.emulator = None
+        self.thread = None
+        self.stop_event = None
+        self.patches = queue.Queue()
+        self.keys = []
+        self.shown = None
+        self.shown_segment = None
+
+        self.width = 24
+        self.height = 24
+        self.photo = tk.PhotoImage(width=self.width * scale, height=self.height * scale)
+        self.photo.put(LAMP_BROWN, to=(0, 0, self.width * scale, self.height * scale))
+        self.screen = tk.Label(self.frame, image=self.photo, bd=0, takefocus=1, highlightthickness=1,
+                               highlightbackground="#000000", highlightcolor="#5a5a5a")
+        self.screen.pack()
+        self.segment = tk.Label(self.frame, text="000", font=("Courier", 28, "bold"),
+                                bg="#000000", fg=LAMP_YELLOW, anchor="w")
+        self.segment.pack(fill=tk.X)
+
+        self.screen.bind("<Button-1>", lambda e: self.screen.focus_set())
+        self.screen.bind("<KeyPress>", self.on_key)
+        self.screen.bind("<KeyRelease>", self.on_key)
+        self.frame.after(REFRESH_MS, self.refresh)
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, rom, hz):
+        self.stop()
+        self.emulator = headless.load_emulator(rom)
+        self.width, self.height = self.emulator.SCREEN_WIDTH, self.emulator.SCREEN_HEIGHT
+        self.shown = None
+        self.shown_segment = None
+        self.patches = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(self.emulator, hz, self.stop_event, self.patches),
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def patch(self, changes, size, pc_map):
+        self.patches.put((changes, size, pc_map))
+
+    def input_value(self):
+        return KEY_VALUES[self.keys[-1]] if self.keys else 0
+
+    def on_key(self, event):
+        if event.keysym not in KEY_VALUES:
+            return
+        if event.keysym in self.keys:
+            self.keys.remove(event.keysym)
+        if event.type == tk.EventType.KeyPress:
+            self.keys.append(event.keysym)
+        return "break"
+
+    def run(self, emulator, hz, stop_event, patches):
+        cycle_time = 1.0 / hz
+        max_burst = max(1, int(hz * MAX_LAG))
+        last_cycle = time.time()
+        while not stop_event.is_set():
+            while not patches.empty():
+                emulator.patch_rom(*patches.get())
+            now = time.time()
+            cycles_to_run = int((now - last_cycle) / cycle_time)
+            if cycles_to_run > max_burst:
+                last_cycle += (cycles_to_run - max_burst) * cycle_time
+                cycles_to_run = max_burst
+            emulator.REG[15] = self.input_value()
+            for _ in range(cycles_to_run):
+                if emulator.HALT:
+                    break
+                emulator.run_instruction()
+                emulator.cycle_count += 1
+            last_cycle += cycles_to_run * cycle_time
+            time.sleep(min(cycle_time, 1.0 / 240))
+
+    def refresh(self):
+        emulator = self.emulator
+        if emulator is not None:
+            s = self.scale
+            current = [list(row) for row in emulator.screen_buf]
+            if self.shown is None:
+                self.shown = [[0] * self.width for _ in range(self.height)]
+                self.photo.put(LAMP_BROWN, to=(0, 0, self.width * s, self.height * s))
+            # seuls les segments de ligne modifiés sont redessinés
+            for y, (row, old) in enumerate(zip(current, self.shown)):
+                if row == old:
+                    continue
+                x = 0
+                while x < self.width:
+                    if row[x] == old[x]:
+                        x += 1
+                        continue
+                    end = x
+                    while end < self.width and row[end] != old[end] and row[end] == row[x]:
+                        end += 1
+                    color = LAMP_YELLOW if row[x] else LAMP_BROWN
+                    self.photo.put(color, to=(x * s, y * s, end * s, (y + 1) * s))
+                    x = end
+            self.shown = current
+            if emulator.segment_value != self.shown_segment:
+                self.shown_segment = emulator.segment_value
+                self.segment.config(text=f"{self.shown_segment:03}")
+        self.frame.after(REFRESH_MS, self.refresh)
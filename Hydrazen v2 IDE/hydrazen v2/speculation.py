@@ -0,0 +1,72 @@
+import queue
+import threading
+import headless
+from assembleur import assemble
+
+IDLE_MS = 400
+POLL_MS = 50
+MAX_CYCLES = 20000
+CHUNK = 1000
+
+class Speculator:
+    def __init__(self, widget, on_result, idle_ms=IDLE_MS, max_cycles=MAX_CYCLES):
+        self.widget = widget
+        self.on_result = on_result
+        self.idle_ms = idle_ms
+        self.max_cycles = max_cycles
+        self.generation = 0
+        self.pending = None
+        self.source = None
+        self.results = queue.Queue()
+        self.widget.after(POLL_MS, self.poll)
+
+    def schedule(self, source):
+        # chaque modification invalide la course en cours et relance le délai d'inactivité
+        if source == self.source:
+            return
+        self.source = source
+        self.generation += 1
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+        self.pending = self.widget.after(self.idle_ms, self.start, source, self.generation)
+
+    def cancel(self):
+        self.source = None
+        self.generation += 1
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+
+    def start(self, source, generation):
+        self.pending = None
+        if generation != self.generation:
+            return
+        try:
+            rom = assemble(source)
+        except Exception as e:
+            self.on_result({"error": str(e)})
+            return
+        if not rom:
+            self.on_result({"error": "programme vide"})
+            return
+        threading.Thread(target=self.run, args=(rom, generation), daemon=True).start()
+
+    def run(self, rom, generation):
+        emulator = headless.load_emulator(rom)
+        while emulator.cycle_count < self.max_cycles and not emulator.HALT:
+            if generation != self.generation:
+                return
+            headless.run(emulator, min(emulator.cycle_count + CHUNK, self.max_cycles))
+        self.results.put((generation, {
+            "halted": emulator.HALT,
+            "cycles": emulator.cycle_count,
+            "segment": emulator.segment_value,
+            "screen": [list(row) for row in emulator.screen_buf],
+        }))
+
+    def poll(self):
+        while not self.results.empty():
+            generation, result = self.results.get()
+            if generation == self.generation:
+                self.on_result(result)
+        self.widget.after(POLL_MS, self.poll)
@@ -0,0 +1,357 @@
+import argparse
+import itertools
+import random
+import time
+import headless
+from assembleur import OPCODES, assemble
+
+NAMES = {v: k for k, v in OPCODES.items()}
+ALU = (0x2, 0x3, 0x4, 0x5, 0x6, 0x7)
+COMMUTATIVE = (0x2, 0x4, 0x5, 0x6, 0x7)
+SHIFTS = (0x9, 0xA)
+LDI = 0xB
+ADI = 0xC
+ALLOWED = ALU + SHIFTS + (0x0, LDI, ADI)
+
+LANE = 9
+FILTER_LANES = 64
+SAMPLE_LANES = 1 << 16
+
+# Les valeurs 8 bits sont rangées dans des "voies" de 9 bits d'un seul entier Python :
+# une opération sur l'entier évalue l'instruction pour toutes les entrées à la fois,
+# le 9e bit de chaque voie recevant la retenue.
+class Lanes:
+    def __init__(self, count):
+        self.count = count
+        self.ones = sum(1 << (LANE * i) for i in range(count))
+        self.mask = self.ones * 0xFF
+        self.guard = self.ones << 8
+
+    def pack(self, values):
+        v = 0
+        for i, x in enumerate(values):
+            v |= (x & 0xFF) << (LANE * i)
+        return v
+
+    def zero(self, v):
+        return self.ones ^ (((v + self.mask) & self.guard) >> 8)
+
+    def step(self, state, ins):
+        regs, z, c = state
+        op, a, b, dst, imm = ins
+        if op == 0x0:
+            return state
+        regs = list(regs)
+        if op in ALU:
+            x, y = regs[a], regs[b]
+            if op == 0x2:
+                s = x + y
+                res = s & self.mask
+                c = (s & self.guard) >> 8
+            elif op == 0x3:
+                d = (x | self.guard) - y
+                res = d & self.mask
+                c = (self.guard ^ (d & self.guard)) >> 8
+            else:
+                if op == 0x4:
+                    res = x & y
+                elif op == 0x5:
+                    res = x | y
+                elif op == 0x6:
+                    res = x ^ y
+                else:
+                    res = self.mask ^ (x | y)
+                c = 0
+        elif op == 0x9:
+            res = (regs[a] >> 1) & self.mask
+            c = 0
+        elif op == 0xA:
+            res = (regs[a] << 1) & self.mask
+            c = 0
+        elif op == LDI:
+            regs[dst] = imm * self.ones
+            return tuple(regs), z, c
+        else:
+            res = (regs[dst] + imm * self.ones) & self.mask
+            c = 0
+        regs[dst] = res
+        return tuple(regs), self.zero(res), c
+
+def decode_rom(rom):
+    program = []
+    for i in range(0, len(rom), 2):
+        op = rom[i] >> 4
+        operands = ((rom[i] & 0x0F) << 8) | rom[i + 1]
+        a = (operands >> 8) & 0xF
+        b = (operands >> 4) & 0xF
+        c = operands & 0xF
+        imm = operands & 0xFF
+        if op not in ALLOWED:
+            raise ValueError(f"{NAMES[op]} n'est pas supporté (seulement du code linéaire sans E/S)")
+        if op in SHIFTS:
+            program.append((op, a, 0, c, 0))
+        elif op in (LDI, ADI):
+            program.append((op, 0, 0, a, imm))
+        elif op in ALU:
+            program.append((op, a, b, c, 0))
+        else:
+            program.append((0x0, 0, 0, 0, 0))
+    return program
+
+def format_instruction(ins):
+    op, a, b, c, imm = ins
+    name = NAMES[op]
+    if op in ALU:
+        return f"{name} R{a}, R{b}, R{c}"
+    if op in SHIFTS:
+        return f"{name} R{a}, R{a}, R{c}"
+    if op in (LDI, ADI):
+        return f"{name} R{c}, {imm}"
+    return name
+
+def reads_writes(ins):
+    op, a, b, c, _ = ins
+    if op in ALU:
+        return {a, b}, c
+    if op in SHIFTS:
+        return {a}, c
+    if op == ADI:
+        return {c}, c
+    if op == LDI:
+        return set(), c
+    return set(), None
+
+def analyse(program):
+    live_in = set()
+    written = set()
+    for ins in program:
+        reads, write = reads_writes(ins)
+        live_in |= reads - written
+        if write is not None:
+            written.add(write)
+    return sorted(live_in), sorted(written)
+
+def sets_flags(program):
+    return any(op not in (0x0, LDI) for op, *_ in program)
+
+# Z/C ne sont jamais des entrées : une séquence qui les compare doit les avoir écrits elle-même,
+# leur valeur initiale (None tant qu'aucune instruction ne les a posés) ne peut donc pas compter.
+def input_vectors(live_in, lanes_wanted, rng):
+    names = list(live_in)
+    if 256 ** len(names) <= lanes_wanted:
+        rows = list(itertools.product(range(256), repeat=len(names)))
+        return names, rows, True
+    special = [0, 1, 2, 127, 128, 254, 255]
+    rows = [tuple(rng.choice(special) if rng.random() < 0.25 else rng.randrange(256) for _ in names)
+            for _ in range(lanes_wanted)]
+    return names, rows, False
+
+def initial_state(lanes, names, rows):
+    regs = [None] * 16
+    for i, name in enumerate(names):
+        regs[name] = lanes.pack([row[i] for row in rows])
+    return tuple(regs), None, None
+
+def run_vector(lanes, state, program):
+    for ins in program:
+        state = lanes.step(state, ins)
+    return state
+
+def outputs(state, live_out, with_flags):
+    regs, z, c = state
+    return tuple(regs[r] for r in live_out) + ((z, c) if with_flags else ())
+
+def candidates(defined, writable, consts):
+    out = []
+    readable = sorted(defined)
+    for dst in writable:
+        for op in ALU:
+            for a in readable:
+                for b in readable:
+                    if op in COMMUTATIVE and b < a:
+                        continue
+                    out.append((op, a, b, dst, 0))
+        for op in SHIFTS:
+            for a in readable:
+                out.append((op, a, 0, dst, 0))
+        for imm in consts:
+            out.append((LDI, 0, 0, dst, imm))
+            if dst in defined:
+                out.append((ADI, 0, 0, dst, imm))
+    return out
+
+def search(program, live_out, with_flags, max_length, rng, budget=None, progress=None):
+    live_in, written = analyse(program)
+    names, rows, _ = input_vectors(live_in, FILTER_LANES, rng)
+    lanes = Lanes(len(rows))
+    start = initial_state(lanes, names, rows)
+    target = outputs(run_vector(lanes, start, program), live_out, with_flags)
+    consts = sorted({imm for op, _, _, _, imm in program if op in (LDI, ADI)} | {0, 1, 255})
+    writable = sorted(set(written) | set(live_out))
+
+    def mismatched(state):
+        got = outputs(state, live_out, with_flags)
+        regs = sum(1 for i in range(len(live_out)) if got[i] != target[i])
+        flags = with_flags and got[len(live_out):] != target[len(live_out):]
+        return regs, flags
+
+    # approfondissement itératif : une longueur terminée sans aucun candidat passant le filtre
+    # est une preuve de minimalité ; si des candidats n'ont échoué qu'à la vérification, elle ne l'est plus
+    # (les états égaux sur les voies du filtre sont fusionnés)
+    deadline = time.time() + budget if budget else None
+    t0 = time.time()
+    unproven = []
+    for length in range(0, min(max_length, len(program) - 1) + 1):
+        seen = {}
+        found = []
+        rejected = [0]
+        nodes = [0]
+        shown = [time.time()]
+
+        def dfs(state, prefix):
+            if found or nodes[0] < 0:
+                return
+            nodes[0] += 1
+            if nodes[0] % 4096 == 0:
+                now = time.time()
+                if deadline and now > deadline:
+                    nodes[0] = -1
+                    return
+                if progress and now - shown[0] >= 5:
+                    shown[0] = now
+                    progress(f"longueur {length} : {nodes[0]} états explorés ({now - t0:.0f} s)...")
+            regs_off, flags_off = mismatched(state)
+            remaining = length - len(prefix)
+            if remaining == 0:
+                if not regs_off and not flags_off:
+                    if verify_vector(program, prefix, live_in, live_out, with_flags, rng):
+                        found.append(list(prefix))
+                    else:
+                        rejected[0] += 1
+                return
+            if regs_off > remaining:
+                return
+            key = state if with_flags else state[0]
+            if seen.get(key, -1) >= remaining:
+                return
+            seen[key] = remaining
+            defined = [r for r, v in enumerate(state[0]) if v is not None]
+            # les registres de travail encore vides sont interchangeables : un seul suffit
+            fresh = [r for r in writable if state[0][r] is None and r not in live_out]
+            for ins in candidates(defined, [r for r in writable if r not in fresh[1:]], consts):
+                if regs_off == remaining and ins[3] not in live_out:
+                    continue
+                prefix.append(ins)
+                dfs(lanes.step(state, ins), prefix)
+                prefix.pop()
+
+        dfs(start, [])
+        if found:
+            return found[0], length, unproven
+        if nodes[0] < 0:
+            return None, length, unproven
+        if rejected[0]:
+            unproven.append(length)
+            if progress:
+                progress(f"longueur {length} : aucune séquence vérifiée, recherche incomplète "
+                         f"({rejected[0]} candidats rejetés après le filtre, {time.time() - t0:.1f} s)")
+        elif progress:
+            progress(f"longueur {length} : aucune séquence ({nodes[0]} états, {time.time() - t0:.1f} s)")
+    return None, None, unproven
+
+def verify_vector(program, cand, live_in, live_out, with_flags, rng):
+    names, rows, _ = input_vectors(live_in, SAMPLE_LANES, rng)
+    lanes = Lanes(len(rows))
+    start = initial_state(lanes, names, rows)
+    return (outputs(run_vector(lanes, start, program), live_out, with_flags)
+            == outputs(run_vector(lanes, start, cand), live_out, with_flags))
+
+def verify_emulator(program, cand, live_in, live_out, with_flags, rng, limit):
+    # vérification finale avec la vraie sémantique de run_instruction()
+    emulator = headless.load_emulator()
+    names, rows, exhaustive = input_vectors(live_in, limit, rng)
+    roms = [assemble("\n".join(format_instruction(i) for i in seq)) for seq in (program, cand)]
+
+    def execute(rom, row, count):
+        emulator.ROM = list(rom) or [0, 0]
+        emulator.PC = 0
+        emulator.REG[:] = [0] * 16
+        emulator.FLAGS["Z"] = emulator.FLAGS["C"] = 0
+        for name, value in zip(names, row):
+            emulator.REG[name] = value
+        for _ in range(count):
+            emulator.run_instruction()
+        return tuple(emulator.REG[r] for r in live_out) + (
+            (emulator.FLAGS["Z"], emulator.FLAGS["C"]) if with_flags else ())
+
+    for row in rows:
+        if execute(roms[0], row, len(program)) != execute(roms[1], row, len(cand)):
+            return False, exhaustive, len(rows), row
+    return True, exhaustive, len(rows), None
+
+def parse_regs(text):
+    return sorted({int(r.strip().upper().lstrip("R")) for r in text.split(",") if r.strip()})
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche la plus courte séquence Hydra2 équivalente")
+    parser.add_argument("program")
+    parser.add_argument("--lines", help="plage de lignes du fichier, ex. 6-11")
+    parser.add_argument("--live-out", help="registres utiles après la séquence, ex. R8,R1 (défaut : tous ceux écrits)")
+    parser.add_argument("--ignore-flags", action="store_true", help="ne pas exiger les mêmes Z/C à la fin")
+    parser.add_argument("--max-length", type=int, help="longueur maximale cherchée (défaut : une de moins que l'original)")
+    parser.add_argument("--budget", type=float, default=60.0, help="temps de recherche maximal en secondes (0 : illimité)")
+    parser.add_argument("--check-limit", type=int, default=1 << 20,
+                        help="nombre maximal d'entrées pour la vérification avec run_instruction()")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.program, "r", encoding="utf-8", errors="ignore") as f:
+        lines = f.read().splitlines()
+    if args.lines:
+        first, last = (int(x) for x in args.lines.split("-"))
+        lines = lines[first - 1:last]
+    program = decode_rom(assemble("\n".join(lines)))
+    if not program:
+        parser.error("aucune instruction dans la sélection")
+
+    live_in, written = analyse(program)
+    live_out = parse_regs(args.live_out) if args.live_out else written
+    with_flags = not args.ignore_flags and sets_flags(program)
+    rng = random.Random(args.seed)
+
+    print("Séquence d'origine :")
+    for ins in program:
+        print("   ", format_instruction(ins))
+    print(f"entrées : {', '.join(f'R{r}' for r in live_in) or 'aucune'}"
+          f" - sorties : {', '.join(f'R{r}' for r in live_out)}{' + Z/C' if with_flags else ''}")
+
+    max_length = len(program) - 1 if args.max_length is None else args.max_length
+    t0 = time.time()
+    best, length, unproven = search(program, live_out, with_flags, max_length, rng, args.budget, print)
+    elapsed = time.time() - t0
+    if best is None:
+        if length is None:
+            print(f"Aucune séquence plus courte jusqu'à {min(max_length, len(program) - 1)} instructions ({elapsed:.1f} s)")
+        else:
+            print(f"Budget de {args.budget:.0f} s épuisé pendant la longueur {length} : "
+                  f"aucune séquence de moins de {length} instructions")
+        if unproven:
+            print(f"non prouvé pour les longueurs {', '.join(map(str, unproven))} : "
+                  f"des candidats n'y ont échoué qu'à la vérification complète")
+        return
+
+    ok, exhaustive, count, row = verify_emulator(program, best, live_in, live_out, with_flags, rng, args.check_limit)
+    if not ok:
+        print(f"Candidat rejeté par run_instruction() sur l'entrée {row}")
+        return
+    print(f"Séquence optimisée ({elapsed:.1f} s) :")
+    for ins in best:
+        print("   ", format_instruction(ins))
+    kind = "toutes les" if exhaustive else "un échantillon de"
+    print(f"vérifiée avec run_instruction() sur {kind} {count} entrées")
+    print(f"{len(program)} -> {len(best)} instructions : {len(program) - len(best)} cycles gagnés par passage")
+    if unproven:
+        print(f"une séquence plus courte n'est pas exclue : longueurs {', '.join(map(str, unproven))} non prouvées")
+
+if __name__ == "__main__":
+    main()